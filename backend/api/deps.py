@@ -1,16 +1,16 @@
-from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
-from bson import ObjectId
 from backend.core.config import settings
-from backend.core.security import ALGORITHM
-from backend.db.mongodb import get_database
+from backend.core.security import ALGORITHM, is_admin_token
+from backend.db.repository import InvalidIdError, Repositories
+from backend.db.storage import get_repositories
 from backend.models.user import UserResponse
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db = Depends(get_database)):
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], repos: Repositories = Depends(get_repositories)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,16 +25,23 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db = D
         raise credentials_exception
     
     try:
-        object_id = ObjectId(user_id)
-    except:
+        user = await repos.users.get_by_id(user_id)
+    except InvalidIdError:
         raise credentials_exception
         
-    user = await db.users.find_one({"_id": object_id})
     if user is None:
         raise credentials_exception
     
     return UserResponse(
         email=user["email"],
         name=user.get("name"),
-        id=str(user["_id"])
-    )
\ No newline at end of file
+        id=user["id"],
+        plan=user.get("plan") or settings.GENERATION_DEFAULT_PLAN
+    )
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Admin routes are only exposed when an admin token is configured
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from typing import List
+
+from backend.api.deps import require_admin
+from backend.services.profiling import list_profiles, profile_path
+
+router = APIRouter()
+
+@router.get("/profiles", response_model=List[dict], dependencies=[Depends(require_admin)])
+async def get_profiles(limit: int = 50):
+    return list_profiles(limit)
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, kind: str = "speedscope"):
+    if kind not in ("speedscope", "summary"):
+        raise HTTPException(status_code=400, detail="kind must be 'speedscope' or 'summary'")
+
+    path = profile_path(profile_id, kind)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.{kind}.json")
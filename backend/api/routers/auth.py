@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from backend.db.mongodb import get_database
+from backend.db.repository import Repositories
+from backend.db.storage import get_repositories
 from backend.core.security import get_password_hash, verify_password, create_access_token
 from backend.models.user import UserCreate, UserResponse
 from backend.api.deps import get_current_user
+from backend.core.config import settings
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -16,31 +18,30 @@ class Token(BaseModel):
     token_type: str
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user_in: UserCreate, db = Depends(get_database)):
-    existing_user = await db.users.find_one({"email": user_in.email})
+async def signup(user_in: UserCreate, repos: Repositories = Depends(get_repositories)):
+    existing_user = await repos.users.get_by_email(user_in.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email already exists"
         )
     
-    user_doc = {
-        "email": user_in.email,
-        "hashed_password": get_password_hash(user_in.password),
-        "name": user_in.name
-    }
-    
-    result = await db.users.insert_one(user_doc)
+    user = await repos.users.create(
+        email=user_in.email,
+        hashed_password=get_password_hash(user_in.password),
+        name=user_in.name
+    )
     
     return UserResponse(
-        id=str(result.inserted_id),
+        id=user["id"],
         email=user_in.email,
-        name=user_in.name
+        name=user_in.name,
+        plan=user.get("plan") or settings.GENERATION_DEFAULT_PLAN
     )
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest, db = Depends(get_database)):
-    user = await db.users.find_one({"email": login_data.email})
+async def login(login_data: LoginRequest, repos: Repositories = Depends(get_repositories)):
+    user = await repos.users.get_by_email(login_data.email)
     if not user or not verify_password(login_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,7 +49,7 @@ async def login(login_data: LoginRequest, db = Depends(get_database)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(subject=str(user["_id"]))
+    access_token = create_access_token(subject=user["id"])
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
@@ -0,0 +1,90 @@
+"""Per-route latency on each storage backend.
+
+Drives the app in-process through httpx's ASGI transport, so numbers reflect
+routing, validation and storage, not the network. Requires httpx:
+
+    pip install httpx
+    python -m backend.benchmarks.route_latency --iterations 200
+
+The MongoDB run uses MONGODB_URI from backend/.env and is skipped when it isn't
+set. The SQLite run uses a throwaway database file.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from backend.core.config import settings
+from backend.db.storage import storage
+from backend.main import app
+
+async def _timed(samples: Dict[str, List[float]], route: str, request):
+    start = time.perf_counter()
+    response = await request
+    samples.setdefault(route, []).append((time.perf_counter() - start) * 1000)
+    response.raise_for_status()
+    return response
+
+async def run_backend(backend: str, iterations: int) -> Dict[str, List[float]]:
+    settings.STORAGE_BACKEND = backend
+    await storage.connect()
+    samples: Dict[str, List[float]] = {}
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+            await client.post("/api/v1/auth/signup", json={"email": email, "password": "bench", "name": "Bench"})
+            login = await client.post("/api/v1/auth/login", json={"email": email, "password": "bench"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            project = await client.post("/api/v1/projects/", json={"name": "Bench"}, headers=headers)
+            project_id = project.json()["id"]
+
+            for i in range(iterations):
+                await _timed(samples, "GET /auth/me", client.get("/api/v1/auth/me", headers=headers))
+                await _timed(samples, "GET /projects", client.get("/api/v1/projects/", headers=headers))
+                await _timed(samples, "GET /projects/{id}", client.get(f"/api/v1/projects/{project_id}", headers=headers))
+
+                # Unique topics so request coalescing doesn't replay earlier results
+                body = {"project_id": project_id, "subject": "Math", "level": "7", "topic": f"Fractions {i}"}
+                created = await _timed(samples, "POST /lesson-plans", client.post("/api/v1/lesson-plans", json=body, headers=headers))
+                await _timed(samples, "GET /lesson-plans", client.get(f"/api/v1/lesson-plans?project_id={project_id}", headers=headers))
+                await _timed(samples, "DELETE /lesson-plans/{id}", client.delete(f"/api/v1/lesson-plans/{created.json()['id']}", headers=headers))
+
+            await client.delete(f"/api/v1/projects/{project_id}", headers=headers)
+    finally:
+        await storage.close()
+
+    return samples
+
+def report(backend: str, samples: Dict[str, List[float]]):
+    print(f"\n{backend}")
+    print(f"  {'route':<28}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for route, values in samples.items():
+        values = sorted(values)
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"  {route:<28}{statistics.median(values):>10.2f}{p95:>10.2f}{statistics.mean(values):>10.2f}")
+
+async def main(iterations: int):
+    backends = ["sqlite"]
+    if settings.MONGODB_URI:
+        backends.insert(0, "mongodb")
+    else:
+        print("MONGODB_URI is not set, skipping the MongoDB backend.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.SQLITE_PATH = os.path.join(tmp, "bench.db")
+        for backend in backends:
+            report(backend, await run_backend(backend, iterations))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -1,15 +1,34 @@
 from pydantic_settings import BaseSettings
-from typing import List, Union
-from pydantic import AnyHttpUrl, field_validator
+from typing import Dict, List, Literal, Optional, Union
+from pydantic import AnyHttpUrl, field_validator, model_validator
 import json
 
 class Settings(BaseSettings):
     APP_ENV: str = "development"
     PORT: int = 8000
-    MONGODB_URI: str
+    STORAGE_BACKEND: Literal["mongodb", "sqlite"] = "mongodb"
+    MONGODB_URI: Optional[str] = None
+    SQLITE_PATH: str = "backend/quick-beaver-dive.db"
     JWT_SECRET: str
     JWT_EXPIRES_IN: int = 86400
     CORS_ORIGINS: List[str] = []
+    COALESCING_TTL_SECONDS: int = 60
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_INTERVAL_SECONDS: int = 21600
+    ARCHIVE_MAX_AGE_DAYS: int = 365
+    ARCHIVE_PROJECT_IDLE_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 500
+    GENERATION_GLOBAL_CONCURRENCY: int = 8
+    GENERATION_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    GENERATION_DEFAULT_PLAN: str = "free"
+    GENERATION_PLAN_CONCURRENCY: Dict[str, int] = {"free": 1, "pro": 4}
+    GENERATION_PLAN_WEIGHTS: Dict[str, int] = {"free": 1, "pro": 2}
+    ADMIN_TOKEN: Optional[str] = None
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 2.0
+    PROFILING_DIR: str = "backend/profiles"
+    PROFILING_MAX_FILES: int = 50
 
     @field_validator("CORS_ORIGINS", mode="before")
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
@@ -21,6 +40,14 @@ class Settings(BaseSettings):
             return v
         raise ValueError(v)
 
+    @model_validator(mode="after")
+    def check_default_plan(self) -> "Settings":
+        if self.GENERATION_DEFAULT_PLAN not in self.GENERATION_PLAN_CONCURRENCY:
+            raise ValueError(
+                f"GENERATION_DEFAULT_PLAN {self.GENERATION_DEFAULT_PLAN!r} has no entry in GENERATION_PLAN_CONCURRENCY"
+            )
+        return self
+
     class Config:
         env_file = "backend/.env"
         case_sensitive = True
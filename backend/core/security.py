@@ -1,3 +1,4 @@
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Any
 import jwt
@@ -21,4 +22,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+def is_admin_token(token: Optional[str]) -> bool:
+    if not (settings.ADMIN_TOKEN and token):
+        return False
+    # compare_digest rejects non-ASCII str, so compare bytes
+    return hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8"))
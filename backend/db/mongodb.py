@@ -1,11 +1,23 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
 from ..core.config import settings
+from .repository import (
+    CONTENT_TYPES, ContentRepository, ProjectRepository, Repositories, UserRepository, validate_id
+)
 
 class MongoDB:
     client: AsyncIOMotorClient = None
     db_name: str = "quick-beaver-dive"
 
     async def connect_to_database(self):
+        if not settings.MONGODB_URI:
+            raise RuntimeError("MONGODB_URI must be set when STORAGE_BACKEND is mongodb")
         self.client = AsyncIOMotorClient(settings.MONGODB_URI)
         print("Connected to MongoDB.")
 
@@ -14,7 +26,212 @@ class MongoDB:
             self.client.close()
             print("MongoDB connection closed.")
 
+    def repositories(self) -> Repositories:
+        database = self.client[self.db_name]
+        content = {name: MongoContentRepository(database, name) for name in CONTENT_TYPES}
+        return Repositories(
+            users=MongoUserRepository(database),
+            projects=MongoProjectRepository(database),
+            **content
+        )
+
 db = MongoDB()
 
-async def get_database():
-    return db.client[db.db_name]
\ No newline at end of file
+def _object_id(value: str) -> ObjectId:
+    return ObjectId(validate_id(value))
+
+def _now() -> datetime:
+    # BSON dates have millisecond precision; truncate so returned docs match what's stored
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def _to_doc(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if raw is None:
+        return None
+    doc = dict(raw)
+    doc["id"] = str(doc.pop("_id"))
+    if isinstance(doc.get("user_id"), ObjectId):
+        doc["user_id"] = str(doc["user_id"])
+    return doc
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, database):
+        self.collection = database.users
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return _to_doc(await self.collection.find_one({"_id": _object_id(user_id)}))
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return _to_doc(await self.collection.find_one({"email": email}))
+
+    async def create(self, email: str, hashed_password: str, name: Optional[str]) -> Dict[str, Any]:
+        user_doc = {
+            "email": email,
+            "hashed_password": hashed_password,
+            "name": name
+        }
+        result = await self.collection.insert_one(user_doc)
+        user_doc["_id"] = result.inserted_id
+        return _to_doc(user_doc)
+
+class MongoProjectRepository(ProjectRepository):
+    def __init__(self, database):
+        self.collection = database.projects
+
+    def _owned(self, project_id: str, user_id: str) -> Dict[str, Any]:
+        uid = _object_id(user_id)
+        # Projects store user_id as an ObjectId; older documents have it as a string
+        return {"_id": _object_id(project_id), "user_id": {"$in": [uid, str(uid)]}}
+
+    async def list_for_user(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        uid = _object_id(user_id)
+        projects = await self.collection.find({"user_id": {"$in": [uid, str(uid)]}}).to_list(length=limit)
+        return [_to_doc(p) for p in projects]
+
+    async def create(self, user_id: str, name: str) -> Dict[str, Any]:
+        now = _now()
+        new_project = {
+            "name": name,
+            "user_id": _object_id(user_id),
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self.collection.insert_one(new_project)
+        new_project["_id"] = result.inserted_id
+        return _to_doc(new_project)
+
+    async def get_for_user(self, project_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return _to_doc(await self.collection.find_one(self._owned(project_id, user_id)))
+
+    async def update_name(self, project_id: str, user_id: str, name: str) -> Optional[Dict[str, Any]]:
+        project = await self.collection.find_one_and_update(
+            self._owned(project_id, user_id),
+            {"$set": {"name": name, "updated_at": _now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        return _to_doc(project)
+
+    async def delete_for_user(self, project_id: str, user_id: str) -> bool:
+        result = await self.collection.delete_one(self._owned(project_id, user_id))
+        return result.deleted_count > 0
+
+    async def touch(self, project_id: str, accessed_at: datetime):
+        await self.collection.update_one(
+            {"_id": _object_id(project_id)},
+            {"$set": {"last_accessed_at": accessed_at}}
+        )
+
+    async def list_idle_ids(self, accessed_before: datetime) -> List[str]:
+        projects = await self.collection.find(
+            {"$or": [
+                {"last_accessed_at": {"$lt": accessed_before}},
+                {"last_accessed_at": {"$exists": False}, "updated_at": {"$lt": accessed_before}},
+            ]},
+            {"_id": 1}
+        ).to_list(None)
+        return [str(p["_id"]) for p in projects]
+
+    async def mark_archived(self, project_ids: List[str], content_type: str):
+        ids = [ObjectId(pid) for pid in set(project_ids) if ObjectId.is_valid(pid)]
+        await self.collection.update_many(
+            {"_id": {"$in": ids}},
+            {"$addToSet": {"archived_collections": content_type}}
+        )
+
+    async def clear_archived(self, project_id: str, content_type: str):
+        await self.collection.update_one(
+            {"_id": _object_id(project_id)},
+            {"$pull": {"archived_collections": content_type}}
+        )
+
+class MongoContentRepository(ContentRepository):
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self.collection = database[name]
+        self.archive = database[f"{name}_archive"]
+        self._archive_indexed = False
+
+    async def list_by_project(self, project_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        items = await self.collection.find({"project_id": project_id}).to_list(limit)
+        return [_to_doc(item) for item in items]
+
+    async def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        item = dict(doc)
+        if isinstance(item.get("created_at"), datetime):
+            item["created_at"] = item["created_at"].replace(
+                microsecond=item["created_at"].microsecond // 1000 * 1000
+            )
+        result = await self.collection.insert_one(item)
+        item["_id"] = result.inserted_id
+        return _to_doc(item)
+
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        oid = _object_id(item_id)
+        item = await self.collection.find_one({"_id": oid})
+        if item is None:
+            item = await self.archive.find_one({"_id": oid})
+        return _to_doc(item)
+
+    async def delete(self, item_id: str) -> bool:
+        oid = _object_id(item_id)
+        result = await self.collection.delete_one({"_id": oid})
+        if result.deleted_count == 0:
+            result = await self.archive.delete_one({"_id": oid})
+        return result.deleted_count > 0
+
+    async def archive_batch(
+        self,
+        limit: int,
+        created_before: Optional[datetime] = None,
+        project_ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        if not self._archive_indexed:
+            await self.archive.create_index("project_id")
+            self._archive_indexed = True
+
+        query: Dict[str, Any] = {}
+        if created_before is not None:
+            query["created_at"] = {"$lt": created_before}
+            query["$or"] = [{"rehydrated_at": {"$exists": False}}, {"rehydrated_at": {"$lt": created_before}}]
+        if project_ids is not None:
+            query["project_id"] = {"$in": project_ids}
+
+        docs = await self.collection.find(query).limit(limit).to_list(limit)
+        if not docs:
+            return []
+
+        now = datetime.utcnow()
+        ids = [doc["_id"] for doc in docs]
+        # Copy before delete; a crash in between leaves a duplicate that the next move replaces
+        await self.archive.delete_many({"_id": {"$in": ids}})
+        await self.archive.insert_many([{**doc, "archived_at": now} for doc in docs])
+        await self.collection.delete_many({"_id": {"$in": ids}})
+        return [doc["project_id"] for doc in docs]
+
+    async def rehydrate_project(self, project_id: str) -> int:
+        docs = await self.archive.find({"project_id": project_id}).to_list(None)
+        if not docs:
+            return 0
+
+        now = datetime.utcnow()
+        ids = [doc["_id"] for doc in docs]
+        for doc in docs:
+            doc.pop("archived_at", None)
+            doc["rehydrated_at"] = now
+
+        await self.collection.delete_many({"_id": {"$in": ids}})
+        await self.collection.insert_many(docs)
+        await self.archive.delete_many({"_id": {"$in": ids}})
+        return len(docs)
+
+    async def stats(self) -> Dict[str, int]:
+        stats = {"documents": await self.collection.estimated_document_count()}
+        try:
+            coll_stats = await self.database.command("collStats", self.name)
+            stats["size_bytes"] = coll_stats.get("size", 0)
+            stats["index_size_bytes"] = coll_stats.get("totalIndexSize", 0)
+        except OperationFailure:
+            # Collection doesn't exist yet or stats aren't available on this deployment
+            pass
+        return stats
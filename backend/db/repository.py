@@ -0,0 +1,115 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+# Storage-agnostic interfaces used by the routers and services.
+# Documents are plain dicts with a string "id" in place of Mongo's "_id", so
+# they can be passed straight to the *Response models.
+
+CONTENT_TYPES = ("lesson_plans", "worksheets", "parent_updates")
+
+class InvalidIdError(ValueError):
+    pass
+
+def validate_id(value: Any) -> str:
+    # Both backends use ObjectId-formatted ids so clients see the same ids and errors
+    if isinstance(value, ObjectId):
+        return str(value)
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise InvalidIdError(value)
+    return value
+
+def new_id() -> str:
+    return str(ObjectId())
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def create(self, email: str, hashed_password: str, name: Optional[str]) -> Dict[str, Any]: ...
+
+class ProjectRepository(ABC):
+    @abstractmethod
+    async def list_for_user(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def create(self, user_id: str, name: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def get_for_user(self, project_id: str, user_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def update_name(self, project_id: str, user_id: str, name: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def delete_for_user(self, project_id: str, user_id: str) -> bool: ...
+
+    @abstractmethod
+    async def touch(self, project_id: str, accessed_at: datetime): ...
+
+    @abstractmethod
+    async def list_idle_ids(self, accessed_before: datetime) -> List[str]: ...
+
+    @abstractmethod
+    async def mark_archived(self, project_ids: List[str], content_type: str): ...
+
+    @abstractmethod
+    async def clear_archived(self, project_id: str, content_type: str): ...
+
+class ContentRepository(ABC):
+    @abstractmethod
+    async def list_by_project(self, project_id: str, limit: int = 1000) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Looks in the hot store first, then the archive."""
+
+    @abstractmethod
+    async def delete(self, item_id: str) -> bool:
+        """Deletes from whichever of the hot store or the archive holds the item."""
+
+    @abstractmethod
+    async def archive_batch(
+        self,
+        limit: int,
+        created_before: Optional[datetime] = None,
+        project_ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Moves up to `limit` matching items to the archive and returns their project ids.
+
+        With `created_before`, items rehydrated after that time are skipped so they
+        only age out again a full period later.
+        """
+
+    @abstractmethod
+    async def rehydrate_project(self, project_id: str) -> int: ...
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]: ...
+
+class Repositories:
+    def __init__(
+        self,
+        users: UserRepository,
+        projects: ProjectRepository,
+        lesson_plans: ContentRepository,
+        worksheets: ContentRepository,
+        parent_updates: ContentRepository,
+    ):
+        self.users = users
+        self.projects = projects
+        self.lesson_plans = lesson_plans
+        self.worksheets = worksheets
+        self.parent_updates = parent_updates
+
+    def content(self, content_type: str) -> ContentRepository:
+        return getattr(self, content_type)
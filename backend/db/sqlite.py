@@ -0,0 +1,334 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+from ..core.config import settings
+from .repository import (
+    CONTENT_TYPES, ContentRepository, ProjectRepository, Repositories, UserRepository, new_id, validate_id
+)
+
+# Embedded storage for single-node deployments. Content items keep their indexed
+# fields as columns and the rest of the document as JSON in "data", so one
+# repository class serves every content type.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    name TEXT,
+    plan TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    last_accessed_at TEXT,
+    archived_collections TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS projects_user_id ON projects (user_id);
+"""
+
+CONTENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    rehydrated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {name}_project_id ON {name} (project_id);
+CREATE INDEX IF NOT EXISTS {name}_created_at ON {name} (created_at);
+CREATE TABLE IF NOT EXISTS {name}_archive (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    rehydrated_at TEXT,
+    data TEXT NOT NULL,
+    archived_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {name}_archive_project_id ON {name}_archive (project_id);
+"""
+
+class SQLiteDB:
+    conn: aiosqlite.Connection = None
+
+    async def connect_to_database(self):
+        self.conn = await aiosqlite.connect(settings.SQLITE_PATH)
+        self.conn.row_factory = aiosqlite.Row
+        # aiosqlite shares one connection, so writes are serialized here rather than by SQLite
+        self.write_lock = asyncio.Lock()
+
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self.conn.executescript(SCHEMA + "".join(CONTENT_SCHEMA.format(name=name) for name in CONTENT_TYPES))
+        await self._migrate()
+        await self.conn.commit()
+        print(f"Connected to SQLite at {settings.SQLITE_PATH}.")
+
+    async def _migrate(self):
+        # Columns added after the first release; CREATE TABLE IF NOT EXISTS won't add them
+        user_columns = {row["name"] for row in await self.fetch_all("PRAGMA table_info(users)")}
+        if "plan" not in user_columns:
+            await self.conn.execute("ALTER TABLE users ADD COLUMN plan TEXT")
+
+    async def close_database_connection(self):
+        if self.conn:
+            await self.conn.close()
+            self.conn = None
+            print("SQLite connection closed.")
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.write_lock:
+            try:
+                yield self.conn
+                await self.conn.commit()
+            except BaseException:
+                await self.conn.rollback()
+                raise
+
+    async def fetch_one(self, sql: str, params=()) -> Optional[aiosqlite.Row]:
+        async with self.conn.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def fetch_all(self, sql: str, params=()) -> List[aiosqlite.Row]:
+        async with self.conn.execute(sql, params) as cursor:
+            return list(await cursor.fetchall())
+
+    def repositories(self) -> Repositories:
+        content = {name: SQLiteContentRepository(self, name) for name in CONTENT_TYPES}
+        return Repositories(
+            users=SQLiteUserRepository(self),
+            projects=SQLiteProjectRepository(self),
+            **content
+        )
+
+sqlite_db = SQLiteDB()
+
+def _dt(value: Optional[datetime]) -> Optional[str]:
+    # Fixed-width ISO strings so SQL comparisons order chronologically
+    return value.isoformat(timespec="microseconds") if value is not None else None
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+def _placeholders(values: List[Any]) -> str:
+    return ", ".join("?" for _ in values)
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, database: SQLiteDB):
+        self.database = database
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.database.fetch_one("SELECT * FROM users WHERE id = ?", (validate_id(user_id),))
+        return dict(row) if row else None
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        row = await self.database.fetch_one("SELECT * FROM users WHERE email = ?", (email,))
+        return dict(row) if row else None
+
+    async def create(self, email: str, hashed_password: str, name: Optional[str]) -> Dict[str, Any]:
+        user = {"id": new_id(), "email": email, "hashed_password": hashed_password, "name": name, "plan": None}
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                "INSERT INTO users (id, email, hashed_password, name) VALUES (?, ?, ?, ?)",
+                (user["id"], email, hashed_password, name)
+            )
+        return user
+
+class SQLiteProjectRepository(ProjectRepository):
+    def __init__(self, database: SQLiteDB):
+        self.database = database
+
+    def _to_doc(self, row: Optional[aiosqlite.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        doc = dict(row)
+        for field in ("created_at", "updated_at", "last_accessed_at"):
+            doc[field] = _parse_dt(doc[field])
+        doc["archived_collections"] = json.loads(doc["archived_collections"])
+        return doc
+
+    async def list_for_user(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = await self.database.fetch_all(
+            "SELECT * FROM projects WHERE user_id = ? LIMIT ?", (validate_id(user_id), limit)
+        )
+        return [self._to_doc(row) for row in rows]
+
+    async def create(self, user_id: str, name: str) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        project_id = new_id()
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                "INSERT INTO projects (id, user_id, name, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (project_id, validate_id(user_id), name, _dt(now), _dt(now))
+            )
+        return {
+            "id": project_id,
+            "user_id": user_id,
+            "name": name,
+            "created_at": now,
+            "updated_at": now,
+            "last_accessed_at": None,
+            "archived_collections": [],
+        }
+
+    async def get_for_user(self, project_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.database.fetch_one(
+            "SELECT * FROM projects WHERE id = ? AND user_id = ?", (validate_id(project_id), validate_id(user_id))
+        )
+        return self._to_doc(row)
+
+    async def update_name(self, project_id: str, user_id: str, name: str) -> Optional[Dict[str, Any]]:
+        params = (name, _dt(datetime.utcnow()), validate_id(project_id), validate_id(user_id))
+        async with self.database.transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE projects SET name = ?, updated_at = ? WHERE id = ? AND user_id = ?", params
+            )
+            if cursor.rowcount == 0:
+                return None
+        return await self.get_for_user(project_id, user_id)
+
+    async def delete_for_user(self, project_id: str, user_id: str) -> bool:
+        async with self.database.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM projects WHERE id = ? AND user_id = ?", (validate_id(project_id), validate_id(user_id))
+            )
+            return cursor.rowcount > 0
+
+    async def touch(self, project_id: str, accessed_at: datetime):
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                "UPDATE projects SET last_accessed_at = ? WHERE id = ?", (_dt(accessed_at), validate_id(project_id))
+            )
+
+    async def list_idle_ids(self, accessed_before: datetime) -> List[str]:
+        rows = await self.database.fetch_all(
+            "SELECT id FROM projects WHERE COALESCE(last_accessed_at, updated_at) < ?", (_dt(accessed_before),)
+        )
+        return [row["id"] for row in rows]
+
+    async def mark_archived(self, project_ids: List[str], content_type: str):
+        ids = list(set(project_ids))
+        if not ids:
+            return
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                f"""UPDATE projects SET archived_collections = json_insert(archived_collections, '$[#]', ?)
+                    WHERE id IN ({_placeholders(ids)})
+                    AND NOT EXISTS (SELECT 1 FROM json_each(archived_collections) WHERE value = ?)""",
+                (content_type, *ids, content_type)
+            )
+
+    async def clear_archived(self, project_id: str, content_type: str):
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                """UPDATE projects SET archived_collections = (
+                       SELECT json_group_array(value) FROM json_each(projects.archived_collections) WHERE value != ?
+                   ) WHERE id = ?""",
+                (content_type, validate_id(project_id))
+            )
+
+class SQLiteContentRepository(ContentRepository):
+    def __init__(self, database: SQLiteDB, name: str):
+        self.database = database
+        self.name = name
+        self.archive = f"{name}_archive"
+
+    def _to_doc(self, row: Optional[aiosqlite.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        doc = json.loads(row["data"])
+        doc["id"] = row["id"]
+        doc["project_id"] = row["project_id"]
+        doc["created_at"] = _parse_dt(row["created_at"])
+        if row["rehydrated_at"] is not None:
+            doc["rehydrated_at"] = _parse_dt(row["rehydrated_at"])
+        return doc
+
+    async def list_by_project(self, project_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        rows = await self.database.fetch_all(
+            f"SELECT * FROM {self.name} WHERE project_id = ? LIMIT ?", (project_id, limit)
+        )
+        return [self._to_doc(row) for row in rows]
+
+    async def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        item = dict(doc)
+        item["id"] = new_id()
+        data = {k: v for k, v in item.items() if k not in ("id", "project_id", "created_at", "rehydrated_at")}
+        async with self.database.transaction() as conn:
+            await conn.execute(
+                f"INSERT INTO {self.name} (id, project_id, created_at, data) VALUES (?, ?, ?, ?)",
+                (item["id"], item["project_id"], _dt(item["created_at"]), json.dumps(data, default=str))
+            )
+        return item
+
+    async def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        item_id = validate_id(item_id)
+        row = await self.database.fetch_one(f"SELECT * FROM {self.name} WHERE id = ?", (item_id,))
+        if row is None:
+            row = await self.database.fetch_one(f"SELECT * FROM {self.archive} WHERE id = ?", (item_id,))
+        return self._to_doc(row)
+
+    async def delete(self, item_id: str) -> bool:
+        item_id = validate_id(item_id)
+        async with self.database.transaction() as conn:
+            cursor = await conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (item_id,))
+            if cursor.rowcount == 0:
+                cursor = await conn.execute(f"DELETE FROM {self.archive} WHERE id = ?", (item_id,))
+            return cursor.rowcount > 0
+
+    async def archive_batch(
+        self,
+        limit: int,
+        created_before: Optional[datetime] = None,
+        project_ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        where, params = [], []
+        if created_before is not None:
+            where.append("created_at < ? AND (rehydrated_at IS NULL OR rehydrated_at < ?)")
+            params += [_dt(created_before), _dt(created_before)]
+        if project_ids is not None:
+            where.append(f"project_id IN ({_placeholders(project_ids)})")
+            params += project_ids
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+        async with self.database.transaction() as conn:
+            async with conn.execute(
+                f"SELECT id, project_id FROM {self.name} {where_sql} LIMIT ?", (*params, limit)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            if not rows:
+                return []
+
+            ids = [row["id"] for row in rows]
+            await conn.execute(
+                f"""INSERT OR REPLACE INTO {self.archive} (id, project_id, created_at, rehydrated_at, data, archived_at)
+                    SELECT id, project_id, created_at, rehydrated_at, data, ? FROM {self.name}
+                    WHERE id IN ({_placeholders(ids)})""",
+                (_dt(datetime.utcnow()), *ids)
+            )
+            await conn.execute(f"DELETE FROM {self.name} WHERE id IN ({_placeholders(ids)})", ids)
+        return [row["project_id"] for row in rows]
+
+    async def rehydrate_project(self, project_id: str) -> int:
+        async with self.database.transaction() as conn:
+            cursor = await conn.execute(
+                f"""INSERT OR REPLACE INTO {self.name} (id, project_id, created_at, rehydrated_at, data)
+                    SELECT id, project_id, created_at, ?, data FROM {self.archive} WHERE project_id = ?""",
+                (_dt(datetime.utcnow()), project_id)
+            )
+            moved = cursor.rowcount
+            await conn.execute(f"DELETE FROM {self.archive} WHERE project_id = ?", (project_id,))
+        return moved
+
+    async def stats(self) -> Dict[str, int]:
+        row = await self.database.fetch_one(f"SELECT COUNT(*) AS documents FROM {self.name}")
+        return {"documents": row["documents"]}
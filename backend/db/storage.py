@@ -0,0 +1,31 @@
+from ..core.config import settings
+from .mongodb import db
+from .repository import Repositories
+
+class Storage:
+    backend = None
+    repositories: Repositories = None
+
+    async def connect(self):
+        if settings.STORAGE_BACKEND == "sqlite":
+            # Imported here so MongoDB deployments don't need aiosqlite installed
+            from .sqlite import sqlite_db
+            self.backend = sqlite_db
+        else:
+            self.backend = db
+        await self.backend.connect_to_database()
+        self.repositories = self.backend.repositories()
+
+    async def close(self):
+        if self.backend:
+            await self.backend.close_database_connection()
+        self.repositories = None
+
+    @property
+    def connected(self) -> bool:
+        return self.repositories is not None
+
+storage = Storage()
+
+async def get_repositories() -> Repositories:
+    return storage.repositories
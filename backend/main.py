@@ -3,19 +3,30 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from pymongo import monitoring
 from backend.core.config import settings
-from backend.db.mongodb import db
-from backend.api.routers import auth, projects, content
+from backend.db.storage import storage, get_repositories
+from backend.services.archival import archiver
+from backend.services.admission import admission
+from backend.services.profiling import ProfilingMiddleware, command_timer, profiling_enabled
+from backend.api.deps import require_admin
+from backend.api.routers import auth, projects, content, admin
+
+if profiling_enabled():
+    # Must be registered before the Mongo client is created
+    monitoring.register(command_timer)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await db.connect_to_database()
+    await storage.connect()
+    archiver.start(get_repositories)
     yield
     # Shutdown
-    await db.close_database_connection()
+    await archiver.stop()
+    await storage.close()
 
 app = FastAPI(
     title="Quick Beaver Dive API",
@@ -29,6 +40,10 @@ app = FastAPI(
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["projects"])
 app.include_router(content.router, prefix="/api/v1", tags=["content"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
 
 # Set all CORS enabled origins
 if settings.CORS_ORIGINS:
@@ -42,7 +57,11 @@ if settings.CORS_ORIGINS:
 
 @app.get("/healthz")
 async def health_check():
-    return {"status": "ok", "db": "connected" if db.client else "disconnected"}
+    return {"status": "ok", "db": "connected" if storage.connected else "disconnected"}
+
+@app.get("/metrics/admission", dependencies=[Depends(require_admin)])
+async def admission_metrics():
+    return admission.metrics()
 
 @app.get("/")
 async def root():
@@ -13,6 +13,7 @@ class UserInDB(UserBase):
 
 class UserResponse(UserBase):
     id: str
+    plan: str = "free"
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,152 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+from fastapi import HTTPException, status
+
+from backend.core.config import settings
+
+# Admission control for generation work.
+# Each user may run up to their plan's concurrency, and everyone shares a global
+# limit. When a slot isn't free the request queues; users with waiters are served
+# round-robin, getting up to their plan's weight in grants per turn. A request
+# that waits longer than GENERATION_QUEUE_TIMEOUT_SECONDS gets a 429.
+
+class _Waiter:
+    def __init__(self, user_id: str, limit: int, weight: int):
+        self.user_id = user_id
+        self.limit = limit
+        self.weight = weight
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+class AdmissionController:
+    def __init__(self):
+        self._active: Dict[str, int] = {}
+        self._global_active = 0
+        # Users with waiters, in round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._turns: Dict[str, int] = {}
+
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._avg_hold = 1.0
+
+    def _plan_limits(self, plan: str):
+        plan = plan if plan in settings.GENERATION_PLAN_CONCURRENCY else settings.GENERATION_DEFAULT_PLAN
+        return settings.GENERATION_PLAN_CONCURRENCY[plan], settings.GENERATION_PLAN_WEIGHTS.get(plan, 1)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _grant(self, user_id: str, waited: float):
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        self._global_active += 1
+        self._admitted += 1
+        self._wait_times.append(waited)
+
+    def _dispatch(self):
+        while self._global_active < settings.GENERATION_GLOBAL_CONCURRENCY and self._queues:
+            for user_id, queue in self._queues.items():
+                waiter = queue[0]
+                if self._active.get(user_id, 0) < waiter.limit:
+                    break
+            else:
+                # Every queued user is at their own limit
+                return
+
+            queue.popleft()
+            self._grant(user_id, time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+            self._turns[user_id] = self._turns.get(user_id, 0) + 1
+            if not queue:
+                del self._queues[user_id]
+                self._turns.pop(user_id, None)
+            elif self._turns[user_id] >= waiter.weight:
+                self._queues.move_to_end(user_id)
+                self._turns[user_id] = 0
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues.get(waiter.user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.user_id]
+                self._turns.pop(waiter.user_id, None)
+
+    def _retry_after(self) -> int:
+        backlog = (self.queue_depth + 1) / settings.GENERATION_GLOBAL_CONCURRENCY
+        return max(1, math.ceil(self._avg_hold * backlog))
+
+    async def acquire(self, user_id: str, plan: str):
+        limit, weight = self._plan_limits(plan)
+
+        if (not self._queues
+                and self._global_active < settings.GENERATION_GLOBAL_CONCURRENCY
+                and self._active.get(user_id, 0) < limit):
+            self._grant(user_id, 0.0)
+            return
+
+        waiter = _Waiter(user_id, limit, weight)
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=settings.GENERATION_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self.release(user_id)
+            else:
+                self._remove(waiter)
+            raise
+
+        if not waiter.future.done():
+            self._remove(waiter)
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Generation queue is full, please retry shortly",
+                headers={"Retry-After": str(self._retry_after())},
+            )
+
+    def release(self, user_id: str, held: float = None):
+        self._active[user_id] -= 1
+        if self._active[user_id] == 0:
+            del self._active[user_id]
+        self._global_active -= 1
+        if held is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, plan: str):
+        await self.acquire(user_id, plan)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(user_id, time.monotonic() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "active": self._global_active,
+            "global_limit": settings.GENERATION_GLOBAL_CONCURRENCY,
+            "queue_depth": self.queue_depth,
+            "queued_users": len(self._queues),
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "wait_ms": {
+                "avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "p95": round(1000 * waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                "max": round(1000 * waits[-1], 2) if waits else 0.0,
+            },
+        }
+
+admission = AdmissionController()
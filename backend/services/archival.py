@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from backend.core.config import settings
+from backend.db.repository import CONTENT_TYPES, Repositories
+
+# Cold content (old items, or items from projects nobody has opened recently) is
+# moved from the hot store into its archive. Projects keep an
+# "archived_collections" marker so list routes only look at the archive when
+# something was actually moved, and rehydrate it back into the hot store.
+
+# Don't write to the project on every request, only when the stamp is this stale
+PROJECT_TOUCH_INTERVAL = timedelta(hours=1)
+
+async def touch_project(repos: Repositories, project: Dict[str, Any]):
+    now = datetime.utcnow()
+    last_accessed = project.get("last_accessed_at")
+    if last_accessed is None or now - last_accessed > PROJECT_TOUCH_INTERVAL:
+        await repos.projects.touch(project["id"], now)
+        project["last_accessed_at"] = now
+
+async def rehydrate_project_content(repos: Repositories, content_type: str, project: Dict[str, Any]) -> int:
+    if content_type not in (project.get("archived_collections") or []):
+        return 0
+
+    # Clear the marker first, so an archival run that moves more items meanwhile sets it
+    # again. If the rehydrate fails, restore it so the next list retries.
+    await repos.projects.clear_archived(project["id"], content_type)
+    try:
+        return await repos.content(content_type).rehydrate_project(project["id"])
+    except Exception:
+        await repos.projects.mark_archived([project["id"]], content_type)
+        raise
+
+async def _move_to_archive(repos: Repositories, content_type: str, batch_size: int, **criteria) -> int:
+    moved = 0
+    while True:
+        project_ids = await repos.content(content_type).archive_batch(batch_size, **criteria)
+        if not project_ids:
+            break
+
+        await repos.projects.mark_archived(project_ids, content_type)
+        moved += len(project_ids)
+        if len(project_ids) < batch_size:
+            break
+    return moved
+
+async def hot_set_size(repos: Repositories) -> Dict[str, Dict[str, int]]:
+    return {content_type: await repos.content(content_type).stats() for content_type in CONTENT_TYPES}
+
+async def run_archival(repos: Repositories) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    age_cutoff = now - timedelta(days=settings.ARCHIVE_MAX_AGE_DAYS)
+    idle_cutoff = now - timedelta(days=settings.ARCHIVE_PROJECT_IDLE_DAYS)
+    batch_size = settings.ARCHIVE_BATCH_SIZE
+
+    before = await hot_set_size(repos)
+    idle_project_ids = await repos.projects.list_idle_ids(idle_cutoff)
+
+    moved = {}
+    for content_type in CONTENT_TYPES:
+        count = await _move_to_archive(repos, content_type, batch_size, created_before=age_cutoff)
+
+        for i in range(0, len(idle_project_ids), batch_size):
+            chunk = idle_project_ids[i:i + batch_size]
+            count += await _move_to_archive(repos, content_type, batch_size, project_ids=chunk)
+
+        moved[content_type] = count
+
+    after = await hot_set_size(repos)
+    report = {"started_at": now, "moved": moved, "hot_set_before": before, "hot_set_after": after}
+
+    print(f"Archival run moved {sum(moved.values())} items. Hot set before: {before}, after: {after}")
+    return report
+
+class Archiver:
+    task: asyncio.Task = None
+    last_report: Dict[str, Any] = None
+
+    def start(self, get_repos):
+        if settings.ARCHIVE_ENABLED and self.task is None:
+            self.task = asyncio.create_task(self._run_forever(get_repos))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run_forever(self, get_repos):
+        while True:
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+            try:
+                self.last_report = await run_archival(await get_repos())
+            except Exception as e:
+                print(f"Archival run failed: {e}")
+
+archiver = Archiver()
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from backend.core.config import settings
+
+# Single-flight coalescing for generation endpoints.
+# Identical requests (same user, project, endpoint and normalized inputs, or the
+# same Idempotency-Key) share one in-flight task, and completed results are
+# replayed from a short-TTL store instead of being generated and inserted again.
+# A reused Idempotency-Key must come with the same body, and replays are dropped
+# once an item they returned is deleted.
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        lines = [" ".join(line.split()) for line in value.strip().splitlines()]
+        return "\n".join(line for line in lines if line)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def request_fingerprint(inputs: Dict[str, Any]) -> str:
+    payload = json.dumps(_normalize(inputs), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def coalescing_key(
+    user_id: str,
+    project_id: str,
+    endpoint: str,
+    inputs: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+) -> Tuple[str, ...]:
+    if idempotency_key:
+        return (user_id, endpoint, "idempotency-key", idempotency_key.strip())
+    return (user_id, project_id, endpoint, request_fingerprint(inputs))
+
+def _result_ids(result: Any) -> List[str]:
+    items = result if isinstance(result, list) else [result]
+    return [item.id for item in items if getattr(item, "id", None)]
+
+class RequestCoalescer:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: Dict[Tuple[str, ...], Tuple[str, asyncio.Task]] = {}
+        self._completed: Dict[Tuple[str, ...], Tuple[float, str, Any]] = {}
+        self._keys_by_result_id: Dict[str, Set[Tuple[str, ...]]] = {}
+
+    def _drop_completed(self, key: Tuple[str, ...]):
+        entry = self._completed.pop(key, None)
+        if entry is None:
+            return
+        for result_id in _result_ids(entry[2]):
+            keys = self._keys_by_result_id.get(result_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_result_id[result_id]
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, (expires_at, _, _) in self._completed.items() if expires_at <= now]
+        for key in expired:
+            self._drop_completed(key)
+
+    def forget(self, result_id: str):
+        """Stops replaying any completed result that returned this item."""
+        for key in list(self._keys_by_result_id.get(result_id, ())):
+            self._drop_completed(key)
+
+    def _check_fingerprint(self, stored: str, fingerprint: str):
+        if stored != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+
+    async def run(self, key: Tuple[str, ...], fingerprint: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        if key in self._completed:
+            _, stored, result = self._completed[key]
+            self._check_fingerprint(stored, fingerprint)
+            return result
+
+        if key in self._in_flight:
+            stored, task = self._in_flight[key]
+            self._check_fingerprint(stored, fingerprint)
+        else:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = (fingerprint, task)
+            task.add_done_callback(lambda t: self._on_done(key, fingerprint, t))
+
+        # Shield so a caller that disconnects does not cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Tuple[str, ...], fingerprint: str, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        # Failures are not replayed; the next identical request will retry
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.ttl_seconds > 0:
+            result = task.result()
+            self._completed[key] = (time.monotonic() + self.ttl_seconds, fingerprint, result)
+            for result_id in _result_ids(result):
+                self._keys_by_result_id.setdefault(result_id, set()).add(key)
+
+coalescer = RequestCoalescer(ttl_seconds=settings.COALESCING_TTL_SECONDS)
@@ -0,0 +1,252 @@
+import asyncio
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from backend.core.config import settings
+
+# On-demand request profiling.
+# A background thread samples the event loop thread's stack while a profiled
+# request runs and the result is written as a speedscope file, with a summary of
+# Mongo command time next to it. Only one request is profiled at a time. Samples
+# and command time cover everything the loop does meanwhile, not only that request.
+
+PROFILE_HEADER = "x-profile-token"
+# Sampling these would push real profiles out
+SKIP_PREFIXES = ("/api/v1/admin", "/metrics")
+PROFILE_ID_PATTERN = re.compile(r"^[0-9T-]+-[0-9a-f]{8}$")
+
+def profiling_enabled() -> bool:
+    return bool(settings.PROFILING_TOKEN) or settings.PROFILING_SAMPLE_RATE > 0
+
+def is_profile_token(token: Optional[str]) -> bool:
+    if not (settings.PROFILING_TOKEN and token):
+        return False
+    # compare_digest rejects non-ASCII str, so compare bytes
+    return hmac.compare_digest(token.encode("utf-8"), settings.PROFILING_TOKEN.encode("utf-8"))
+
+class StackSampler(threading.Thread):
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[str, str, int], ...]] = []
+        self.weights: List[float] = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            now = time.perf_counter()
+            self.samples.append(tuple(reversed(stack)))
+            self.weights.append((now - last) * 1000)
+            last = now
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+class MongoCommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        self.recording = False
+        self.commands: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def start_recording(self):
+        with self._lock:
+            self.commands = {}
+            self.recording = True
+
+    def stop_recording(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            self.recording = False
+            return self.commands
+
+    def _record(self, event, failed: bool):
+        if not self.recording:
+            return
+        with self._lock:
+            stats = self.commands.setdefault(event.command_name, {"count": 0, "failed": 0, "total_ms": 0.0})
+            stats["count"] += 1
+            stats["failed"] += int(failed)
+            stats["total_ms"] += event.duration_micros / 1000
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+command_timer = MongoCommandTimer()
+
+class ProfileSession:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+        self.status_code: Optional[int] = None
+
+    def start(self):
+        command_timer.start_recording()
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.mongo_commands = command_timer.stop_recording()
+
+    def _speedscope(self) -> Dict[str, Any]:
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        samples = []
+        for stack in self.sampler.samples:
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": "quick-beaver-dive",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(self.sampler.weights),
+                "samples": samples,
+                "weights": self.sampler.weights,
+            }],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        self_time: Counter = Counter()
+        for stack, weight in zip(self.sampler.samples, self.sampler.weights):
+            if stack:
+                name, filename, line = stack[-1]
+                self_time[f"{name} ({filename}:{line})"] += weight
+
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "created_at": datetime.utcnow().isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": len(self.sampler.samples),
+            "mongo": {
+                "total_ms": round(sum(c["total_ms"] for c in self.mongo_commands.values()), 2),
+                "commands": self.mongo_commands,
+            },
+            "top_self_time_ms": [
+                {"frame": frame, "ms": round(ms, 2)} for frame, ms in self_time.most_common(15)
+            ],
+        }
+
+    def write(self):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILING_DIR, self.id)
+        with open(f"{base}.speedscope.json", "w") as f:
+            json.dump(self._speedscope(), f)
+        with open(f"{base}.summary.json", "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        prune_profiles()
+
+def prune_profiles():
+    summaries = sorted(
+        (name for name in os.listdir(settings.PROFILING_DIR) if name.endswith(".summary.json")),
+        reverse=True
+    )
+    for name in summaries[settings.PROFILING_MAX_FILES:]:
+        profile_id = name[:-len(".summary.json")]
+        for suffix in (".summary.json", ".speedscope.json"):
+            try:
+                os.remove(os.path.join(settings.PROFILING_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    names = sorted(
+        (name for name in os.listdir(settings.PROFILING_DIR) if name.endswith(".summary.json")),
+        reverse=True
+    )
+    profiles = []
+    for name in names[:limit]:
+        with open(os.path.join(settings.PROFILING_DIR, name)) as f:
+            profiles.append(json.load(f))
+    return profiles
+
+def profile_path(profile_id: str, kind: str = "speedscope") -> Optional[str]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.{kind}.json")
+    return path if os.path.isfile(path) else None
+
+class ProfilingMiddleware:
+    # Only added to the app when profiling_enabled(), so it costs nothing otherwise
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = False
+
+    def _should_profile(self, scope) -> bool:
+        if scope["type"] != "http" or self._busy or scope["path"].startswith(SKIP_PREFIXES):
+            return False
+        for name, value in scope["headers"]:
+            if name.decode("latin-1") == PROFILE_HEADER:
+                return is_profile_token(value.decode("latin-1"))
+        return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        session = ProfileSession(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", session.id.encode("latin-1"))]
+            await send(message)
+
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            self._busy = False
+            try:
+                await asyncio.to_thread(session.write)
+            except OSError as e:
+                print(f"Failed to write profile {session.id}: {e}")
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from backend.core.config import settings
+from backend.db.mongodb import MongoDB
+
+@pytest.fixture(params=["sqlite", "mongodb"])
+def run_with_repos(request, tmp_path, monkeypatch):
+    """Runs an async scenario against fresh repositories on each storage backend.
+
+    SQLite uses a file under tmp_path. MongoDB uses MONGODB_URI when it is set
+    (with a throwaway database) and mongomock otherwise.
+    """
+    backend = request.param
+
+    async def with_sqlite(scenario):
+        from backend.db.sqlite import SQLiteDB
+
+        monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "test.db"))
+        database = SQLiteDB()
+        await database.connect_to_database()
+        try:
+            await scenario(database.repositories())
+        finally:
+            await database.close_database_connection()
+
+    async def with_mongodb(scenario):
+        database = MongoDB()
+        database.db_name = f"test-{uuid.uuid4().hex[:8]}"
+        if settings.MONGODB_URI:
+            await database.connect_to_database()
+        else:
+            mongomock_motor = pytest.importorskip("mongomock_motor")
+            database.client = mongomock_motor.AsyncMongoMockClient()
+        try:
+            await scenario(database.repositories())
+        finally:
+            if settings.MONGODB_URI:
+                await database.client.drop_database(database.db_name)
+            await database.close_database_connection()
+
+    def runner(scenario):
+        asyncio.run(with_sqlite(scenario) if backend == "sqlite" else with_mongodb(scenario))
+
+    return runner
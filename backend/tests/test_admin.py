@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+from backend.core.config import settings
+from backend.main import app
+
+client = TestClient(app)
+
+def test_admin_routes_need_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "profile-secret")
+    assert client.get("/metrics/admission", headers={"X-Admin-Token": "profile-secret"}).status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    assert client.get("/metrics/admission").status_code == 403
+    assert client.get("/metrics/admission", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/metrics/admission", headers={"X-Admin-Token": "sékret".encode("latin-1")}).status_code == 403
+    # The profiling token doesn't grant admin access
+    assert client.get("/metrics/admission", headers={"X-Profile-Token": "profile-secret"}).status_code == 403
+
+    response = client.get("/metrics/admission", headers={"X-Admin-Token": "admin-secret"})
+    assert response.status_code == 200
+    assert "queue_depth" in response.json()
+    assert client.get("/api/v1/admin/profiles", headers={"X-Admin-Token": "admin-secret"}).status_code == 200
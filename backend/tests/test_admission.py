@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.core.config import settings
+from backend.services.admission import AdmissionController
+
+@pytest.fixture
+def limits(monkeypatch):
+    def apply(global_limit=1, concurrency=None, weights=None, timeout=5.0):
+        monkeypatch.setattr(settings, "GENERATION_GLOBAL_CONCURRENCY", global_limit)
+        monkeypatch.setattr(settings, "GENERATION_PLAN_CONCURRENCY", concurrency or {"free": 1, "pro": 4})
+        monkeypatch.setattr(settings, "GENERATION_PLAN_WEIGHTS", weights or {"free": 1, "pro": 2})
+        monkeypatch.setattr(settings, "GENERATION_QUEUE_TIMEOUT_SECONDS", timeout)
+    return apply
+
+def assert_idle(admission: AdmissionController):
+    assert admission._active == {}
+    assert admission._global_active == 0
+    assert admission.queue_depth == 0
+
+async def start_worker(admission, user_id, plan, order):
+    async def work():
+        await admission.acquire(user_id, plan)
+        order.append(user_id)
+        await asyncio.sleep(0)
+        admission.release(user_id)
+
+    task = asyncio.ensure_future(work())
+    await asyncio.sleep(0)
+    return task
+
+def test_fast_path_and_release(limits):
+    limits(global_limit=2)
+
+    async def scenario():
+        admission = AdmissionController()
+        async with admission.slot("a", "free"):
+            assert admission._active == {"a": 1}
+            assert admission._global_active == 1
+            assert admission.queue_depth == 0
+        assert_idle(admission)
+        assert admission.metrics()["admitted"] == 1
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("weight, expected", [
+    (1, ["a", "b", "a", "a"]),
+    (2, ["a", "a", "b", "a"]),
+])
+def test_round_robin_between_users(limits, weight, expected):
+    limits(global_limit=1, concurrency={"pro": 4}, weights={"pro": weight})
+
+    async def scenario():
+        admission = AdmissionController()
+        order = []
+        await admission.acquire("a", "pro")
+
+        tasks = [await start_worker(admission, "a", "pro", order) for _ in range(3)]
+        tasks.append(await start_worker(admission, "b", "pro", order))
+        assert admission.queue_depth == 4
+
+        admission.release("a")
+        await asyncio.gather(*tasks)
+
+        assert order == expected
+        assert_idle(admission)
+
+    asyncio.run(scenario())
+
+def test_per_user_limit_below_global(limits):
+    limits(global_limit=2, concurrency={"free": 1})
+
+    async def scenario():
+        admission = AdmissionController()
+        order = []
+        await admission.acquire("a", "free")
+
+        # Global has room, but "a" is at its plan limit
+        second = await start_worker(admission, "a", "free", order)
+        assert admission.queue_depth == 1
+        await admission.acquire("b", "free")
+        assert admission._active == {"a": 1, "b": 1}
+        assert admission.queue_depth == 1
+
+        admission.release("b")
+        assert not second.done()
+        admission.release("a")
+        await second
+
+        assert order == ["a"]
+        assert_idle(admission)
+
+    asyncio.run(scenario())
+
+def test_unknown_plan_uses_default(limits):
+    limits(global_limit=4, concurrency={"free": 1, "pro": 4})
+
+    async def scenario():
+        admission = AdmissionController()
+        await admission.acquire("a", "enterprise")
+        waiter = await start_worker(admission, "a", "enterprise", [])
+        assert admission.queue_depth == 1
+
+        admission.release("a")
+        await waiter
+        assert_idle(admission)
+
+    asyncio.run(scenario())
+
+def test_timeout_raises_429(limits):
+    limits(global_limit=1, timeout=0.05)
+
+    async def scenario():
+        admission = AdmissionController()
+        admission._avg_hold = 2.5
+        await admission.acquire("a", "free")
+
+        with pytest.raises(HTTPException) as exc:
+            await admission.acquire("b", "free")
+
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == str(admission._retry_after()) == "3"
+        assert admission.queue_depth == 0
+        assert admission.metrics()["rejected"] == 1
+
+        admission.release("a")
+        assert_idle(admission)
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_releases_granted_slot(limits):
+    limits(global_limit=1)
+
+    async def scenario():
+        admission = AdmissionController()
+        await admission.acquire("a", "free")
+        waiter = asyncio.ensure_future(admission.acquire("b", "free"))
+        await asyncio.sleep(0)
+
+        # The slot is granted, then the request is cancelled before it resumes
+        admission.release("a")
+        assert admission._active == {"b": 1}
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert_idle(admission)
+        await admission.acquire("c", "free")
+        admission.release("c")
+        assert_idle(admission)
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_leaves_queue(limits):
+    limits(global_limit=1)
+
+    async def scenario():
+        admission = AdmissionController()
+        await admission.acquire("a", "free")
+        waiter = asyncio.ensure_future(admission.acquire("b", "free"))
+        await asyncio.sleep(0)
+        assert admission.queue_depth == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.queue_depth == 0
+        assert admission._active == {"a": 1}
+
+        admission.release("a")
+        assert_idle(admission)
+
+    asyncio.run(scenario())
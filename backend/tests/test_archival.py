@@ -0,0 +1,41 @@
+import pytest
+
+from backend.services.archival import rehydrate_project_content
+from backend.tests.test_repositories import content_doc, make_project
+
+def test_rehydrate_clears_marker(run_with_repos):
+    async def scenario(repos):
+        owner, project = await make_project(repos)
+        item = await repos.worksheets.insert(content_doc(project["id"]))
+        await repos.worksheets.archive_batch(10, project_ids=[project["id"]])
+        await repos.projects.mark_archived([project["id"]], "worksheets")
+
+        project = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert await rehydrate_project_content(repos, "worksheets", project) == 1
+        assert [i["id"] for i in await repos.worksheets.list_by_project(project["id"])] == [item["id"]]
+
+        project = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert project["archived_collections"] == []
+        assert await rehydrate_project_content(repos, "worksheets", project) == 0
+
+    run_with_repos(scenario)
+
+def test_failed_rehydrate_restores_marker(run_with_repos):
+    async def scenario(repos):
+        owner, project = await make_project(repos)
+        await repos.lesson_plans.insert(content_doc(project["id"]))
+        await repos.lesson_plans.archive_batch(10, project_ids=[project["id"]])
+        await repos.projects.mark_archived([project["id"]], "lesson_plans")
+
+        async def fail(project_id):
+            raise RuntimeError("storage unavailable")
+
+        repos.lesson_plans.rehydrate_project = fail
+        project = await repos.projects.get_for_user(project["id"], owner["id"])
+        with pytest.raises(RuntimeError):
+            await rehydrate_project_content(repos, "lesson_plans", project)
+
+        project = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert project["archived_collections"] == ["lesson_plans"]
+
+    run_with_repos(scenario)
@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services import coalescing
+from backend.services.coalescing import RequestCoalescer, coalescing_key, request_fingerprint
+
+INPUTS = {"project_id": "p1", "subject": "Math", "level": "7", "topic": "Fractions"}
+
+class Factory:
+    """Counts calls and returns a new item each time, optionally after a gate opens."""
+
+    def __init__(self, gate: asyncio.Event = None, fail: bool = False):
+        self.calls = 0
+        self.gate = gate
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("generation failed")
+        return SimpleNamespace(id=f"item-{self.calls}")
+
+def test_fingerprint_ignores_whitespace():
+    assert request_fingerprint({"topic": "  Fractions \n\n and  decimals "}) == \
+        request_fingerprint({"topic": "Fractions\nand decimals"})
+    assert request_fingerprint({"topic": "Fractions"}) != request_fingerprint({"topic": "Decimals"})
+
+def test_concurrent_duplicates_run_once():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        gate = asyncio.Event()
+        factory = Factory(gate)
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS)
+        fingerprint = request_fingerprint(INPUTS)
+
+        calls = [asyncio.ensure_future(coalescer.run(key, fingerprint, factory)) for _ in range(5)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*calls)
+
+        assert factory.calls == 1
+        assert {r.id for r in results} == {"item-1"}
+
+        # Replayed from the completed store within the TTL
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-1"
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+def test_failures_are_not_replayed():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS)
+        fingerprint = request_fingerprint(INPUTS)
+
+        with pytest.raises(RuntimeError):
+            await coalescer.run(key, fingerprint, Factory(fail=True))
+
+        factory = Factory()
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-1"
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+def test_reused_idempotency_key_with_different_body():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        other_inputs = {**INPUTS, "topic": "Decimals"}
+        gate = asyncio.Event()
+        factory = Factory(gate)
+
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS, "key-1")
+        assert key == coalescing_key("u1", "p1", "lesson-plans", other_inputs, "key-1")
+
+        # While the first request is in flight
+        first = asyncio.ensure_future(coalescer.run(key, request_fingerprint(INPUTS), factory))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await coalescer.run(key, request_fingerprint(other_inputs), factory)
+        assert exc.value.status_code == 422
+
+        gate.set()
+        assert (await first).id == "item-1"
+
+        # And once it has completed
+        with pytest.raises(HTTPException) as exc:
+            await coalescer.run(key, request_fingerprint(other_inputs), factory)
+        assert exc.value.status_code == 422
+        assert factory.calls == 1
+
+    asyncio.run(scenario())
+
+def test_forget_stops_replay():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        factory = Factory()
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS)
+        other_key = coalescing_key("u1", "p1", "lesson-plans", INPUTS, "key-1")
+        fingerprint = request_fingerprint(INPUTS)
+
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-1"
+        assert (await coalescer.run(other_key, fingerprint, factory)).id == "item-2"
+
+        coalescer.forget("item-1")
+        assert "item-1" not in coalescer._keys_by_result_id
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-3"
+        # Other replays are untouched
+        assert (await coalescer.run(other_key, fingerprint, factory)).id == "item-2"
+        assert factory.calls == 3
+
+        coalescer.forget("unknown")
+
+    asyncio.run(scenario())
+
+def test_expired_results_are_dropped(monkeypatch):
+    async def scenario():
+        clock = [1000.0]
+        monkeypatch.setattr(coalescing, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        factory = Factory()
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS)
+        fingerprint = request_fingerprint(INPUTS)
+
+        await coalescer.run(key, fingerprint, factory)
+        clock[0] += 61
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-2"
+        assert factory.calls == 2
+        assert "item-1" not in coalescer._keys_by_result_id
+
+    asyncio.run(scenario())
+
+def test_zero_ttl_only_coalesces_in_flight():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=0)
+        gate = asyncio.Event()
+        factory = Factory(gate)
+        key = coalescing_key("u1", "p1", "lesson-plans", INPUTS)
+        fingerprint = request_fingerprint(INPUTS)
+
+        calls = [asyncio.ensure_future(coalescer.run(key, fingerprint, factory)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        assert {r.id for r in await asyncio.gather(*calls)} == {"item-1"}
+        assert factory.calls == 1
+
+        assert (await coalescer.run(key, fingerprint, factory)).id == "item-2"
+        assert factory.calls == 2
+        assert coalescer._completed == {}
+        assert coalescer._keys_by_result_id == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,13 @@
+from backend.core.config import settings
+from backend.services.profiling import is_profile_token
+
+def test_is_profile_token(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    assert is_profile_token("secret")
+    assert not is_profile_token("wrong")
+    assert not is_profile_token(None)
+    # Header values are decoded as latin-1 and may hold any non-ASCII character
+    assert not is_profile_token("sékret")
+
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", None)
+    assert not is_profile_token("secret")
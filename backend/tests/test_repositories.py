@@ -0,0 +1,222 @@
+"""Repository contract shared by every storage backend."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db.repository import CONTENT_TYPES, InvalidIdError, new_id
+
+def content_doc(project_id: str, created_at: datetime = None, **fields):
+    return {
+        "project_id": project_id,
+        "subject": "Math",
+        "level": "7",
+        "topic": "Fractions",
+        "file_name": "Math-7-Fractions-LessonPlan.txt",
+        "content": "...",
+        "export_format": "pdf",
+        "created_at": created_at or datetime.utcnow(),
+        **fields,
+    }
+
+async def make_project(repos, name: str = "Class 7"):
+    user = await repos.users.create(f"{new_id()}@example.com", "hashed", "Teacher")
+    return user, await repos.projects.create(user["id"], name)
+
+def test_users(run_with_repos):
+    async def scenario(repos):
+        user = await repos.users.create("teacher@example.com", "hashed", "Teacher")
+        assert user["id"]
+
+        by_id = await repos.users.get_by_id(user["id"])
+        by_email = await repos.users.get_by_email("teacher@example.com")
+        assert by_id["id"] == by_email["id"] == user["id"]
+        assert by_id["email"] == "teacher@example.com"
+        assert by_id["hashed_password"] == "hashed"
+        assert by_id["name"] == "Teacher"
+
+        assert await repos.users.get_by_id(new_id()) is None
+        assert await repos.users.get_by_email("nobody@example.com") is None
+        with pytest.raises(InvalidIdError):
+            await repos.users.get_by_id("not-an-id")
+
+    run_with_repos(scenario)
+
+def test_project_ownership(run_with_repos):
+    async def scenario(repos):
+        owner, project = await make_project(repos)
+        other = await repos.users.create("other@example.com", "hashed", None)
+
+        assert project["user_id"] == owner["id"]
+        assert project["name"] == "Class 7"
+        assert isinstance(project["created_at"], datetime)
+
+        assert (await repos.projects.get_for_user(project["id"], owner["id"]))["id"] == project["id"]
+        assert await repos.projects.get_for_user(project["id"], other["id"]) is None
+        assert [p["id"] for p in await repos.projects.list_for_user(owner["id"])] == [project["id"]]
+        assert await repos.projects.list_for_user(other["id"]) == []
+
+        assert await repos.projects.update_name(project["id"], other["id"], "Stolen") is None
+        updated = await repos.projects.update_name(project["id"], owner["id"], "Class 8")
+        assert updated["name"] == "Class 8"
+        assert updated["updated_at"] >= project["updated_at"]
+
+        assert await repos.projects.delete_for_user(project["id"], other["id"]) is False
+        assert await repos.projects.delete_for_user(project["id"], owner["id"]) is True
+        assert await repos.projects.get_for_user(project["id"], owner["id"]) is None
+
+    run_with_repos(scenario)
+
+def test_project_ids_are_validated(run_with_repos):
+    # Routers turn InvalidIdError into 400 and a None result into 404
+    async def scenario(repos):
+        owner, project = await make_project(repos)
+
+        assert await repos.projects.get_for_user(new_id(), owner["id"]) is None
+        assert await repos.projects.update_name(new_id(), owner["id"], "x") is None
+        assert await repos.projects.delete_for_user(new_id(), owner["id"]) is False
+
+        for call in (
+            repos.projects.get_for_user("bad", owner["id"]),
+            repos.projects.get_for_user(project["id"], "bad"),
+            repos.projects.update_name("bad", owner["id"], "x"),
+            repos.projects.delete_for_user("bad", owner["id"]),
+        ):
+            with pytest.raises(InvalidIdError):
+                await call
+
+    run_with_repos(scenario)
+
+@pytest.mark.parametrize("content_type", CONTENT_TYPES)
+def test_content_crud(run_with_repos, content_type):
+    async def scenario(repos):
+        _, project = await make_project(repos)
+        _, other_project = await make_project(repos, "Other")
+        content = repos.content(content_type)
+
+        item = await content.insert(content_doc(project["id"]))
+        await content.insert(content_doc(other_project["id"]))
+        assert item["id"]
+        assert item["project_id"] == project["id"]
+
+        listed = await content.list_by_project(project["id"])
+        assert [i["id"] for i in listed] == [item["id"]]
+        assert listed[0]["topic"] == "Fractions"
+        assert isinstance(listed[0]["created_at"], datetime)
+
+        fetched = await content.get(item["id"])
+        assert fetched["id"] == item["id"]
+        assert fetched["content"] == "..."
+
+        assert await content.delete(item["id"]) is True
+        assert await content.get(item["id"]) is None
+        assert await content.delete(item["id"]) is False
+        assert await content.list_by_project(project["id"]) == []
+
+        with pytest.raises(InvalidIdError):
+            await content.get("bad")
+        with pytest.raises(InvalidIdError):
+            await content.delete("bad")
+
+    run_with_repos(scenario)
+
+def test_archive_batch_by_age(run_with_repos):
+    async def scenario(repos):
+        _, project = await make_project(repos)
+        content = repos.lesson_plans
+        now = datetime.utcnow()
+
+        old = await content.insert(content_doc(project["id"], now - timedelta(days=400)))
+        new = await content.insert(content_doc(project["id"], now))
+
+        moved = await content.archive_batch(10, created_before=now - timedelta(days=365))
+        assert moved == [project["id"]]
+        assert [i["id"] for i in await content.list_by_project(project["id"])] == [new["id"]]
+
+        # Archived items stay readable and deletable
+        assert (await content.get(old["id"]))["id"] == old["id"]
+        assert await content.archive_batch(10, created_before=now - timedelta(days=365)) == []
+        assert await content.delete(old["id"]) is True
+        assert await content.get(old["id"]) is None
+
+    run_with_repos(scenario)
+
+def test_archive_batch_by_project_and_limit(run_with_repos):
+    async def scenario(repos):
+        _, idle = await make_project(repos, "Idle")
+        _, active = await make_project(repos, "Active")
+        content = repos.worksheets
+
+        for _ in range(3):
+            await content.insert(content_doc(idle["id"]))
+        await content.insert(content_doc(active["id"]))
+
+        assert await content.archive_batch(2, project_ids=[idle["id"]]) == [idle["id"], idle["id"]]
+        assert await content.archive_batch(2, project_ids=[idle["id"]]) == [idle["id"]]
+        assert await content.archive_batch(2, project_ids=[idle["id"]]) == []
+        assert await content.list_by_project(idle["id"]) == []
+        assert len(await content.list_by_project(active["id"])) == 1
+
+    run_with_repos(scenario)
+
+def test_rehydrate_project(run_with_repos):
+    async def scenario(repos):
+        _, project = await make_project(repos)
+        _, other = await make_project(repos, "Other")
+        content = repos.parent_updates
+
+        items = [await content.insert(content_doc(project["id"])) for _ in range(2)]
+        await content.insert(content_doc(other["id"]))
+        await content.archive_batch(10, project_ids=[project["id"], other["id"]])
+
+        assert await content.rehydrate_project(project["id"]) == 2
+        listed = await content.list_by_project(project["id"])
+        assert sorted(i["id"] for i in listed) == sorted(i["id"] for i in items)
+        assert all(isinstance(i["rehydrated_at"], datetime) for i in listed)
+        assert await content.rehydrate_project(project["id"]) == 0
+
+        # Other projects stay archived
+        assert await content.list_by_project(other["id"]) == []
+
+    run_with_repos(scenario)
+
+def test_archive_batch_skips_recently_rehydrated(run_with_repos):
+    async def scenario(repos):
+        _, project = await make_project(repos)
+        content = repos.lesson_plans
+        cutoff = datetime.utcnow() - timedelta(days=365)
+
+        await content.insert(content_doc(project["id"], cutoff - timedelta(days=30)))
+        assert len(await content.archive_batch(10, created_before=cutoff)) == 1
+        assert await content.rehydrate_project(project["id"]) == 1
+
+        # Rehydrated after the cutoff, so it only ages out a full period later
+        assert await content.archive_batch(10, created_before=cutoff) == []
+        assert len(await content.archive_batch(10, created_before=datetime.utcnow() + timedelta(seconds=1))) == 1
+
+    run_with_repos(scenario)
+
+def test_archive_markers_and_idle_projects(run_with_repos):
+    async def scenario(repos):
+        owner, project = await make_project(repos)
+        _, other = await make_project(repos, "Other")
+
+        await repos.projects.mark_archived([project["id"], project["id"]], "worksheets")
+        await repos.projects.mark_archived([project["id"]], "worksheets")
+        await repos.projects.mark_archived([project["id"]], "lesson_plans")
+
+        marked = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert sorted(marked["archived_collections"]) == ["lesson_plans", "worksheets"]
+
+        await repos.projects.clear_archived(project["id"], "worksheets")
+        cleared = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert cleared["archived_collections"] == ["lesson_plans"]
+
+        now = datetime.utcnow()
+        await repos.projects.touch(project["id"], now - timedelta(days=200))
+        await repos.projects.touch(other["id"], now)
+        assert await repos.projects.list_idle_ids(now - timedelta(days=180)) == [project["id"]]
+
+        touched = await repos.projects.get_for_user(project["id"], owner["id"])
+        assert touched["last_accessed_at"] < now - timedelta(days=199)
+
+    run_with_repos(scenario)